@@ -1,240 +1,321 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import pydeck as pdk
-import matplotlib.pyplot as plt
-from geopy.geocoders import Nominatim
 
-# Load Meat Production Data
-@st.cache_data
-def load_meat_data():
-    url = "https://raw.githubusercontent.com/jadegem5/Meat-World-Project/refs/heads/main/global-meat-production.csv"
-    df = pd.read_csv(url)
-    df.rename(columns={
-        "Entity": "Country",
-        "Meat, total | 00001765 || Production | 005510 || tonnes": "Meat_Production"
-    }, inplace=True)
+# Parsed datasets are kept here as Parquet so cold starts skip the download
+CACHE_DIR = Path(__file__).parent / "cache"
+# Bump whenever the layout or dtypes produced by fetch_dataset change, so stale files are ignored
+CACHE_VERSION = 2
+
+BASE_URL = "https://raw.githubusercontent.com/jadegem5/Meat-World-Project/refs/heads/main/"
+
+# Source file, column renames and value column (with its dtype) for each dataset.
+# Tonnage and land area stay float64 so hover values match the source exactly.
+# Time series datasets are indexed by (Year, Country); the others keep Country as a column.
+DATASETS = {
+    "meat": {
+        "file": "global-meat-production.csv",
+        "rename": {
+            "Entity": "Country",
+            "Meat, total | 00001765 || Production | 005510 || tonnes": "Meat_Production"
+        },
+        "value_col": "Meat_Production",
+        "value_dtype": "float64",
+        "indexed": True,
+    },
+    "agriculture": {
+        "file": "total-agricultural-area-over-the-long-term.csv",
+        "rename": {
+            "Entity": "Country",
+            "Land use: Agriculture": "Agricultural_Area"
+        },
+        "value_col": "Agricultural_Area",
+        "value_dtype": "float64",
+        "indexed": True,
+    },
+    "consumption": {
+        "file": "export-2024-11-27T21_19_40.901Z.csv",
+        "rename": {},
+        "value_col": "Kilograms/capita",
+        "value_dtype": "float32",
+        "indexed": False,
+    },
+    "obesity": {
+        "file": "share-of-adults-defined-as-obese.csv",
+        "rename": {
+            "Entity": "Country",
+            "Prevalence of obesity among adults, BMI >= 30 (crude estimate) (%) - Sex: both sexes - Age group: 18+  years": "Obesity"
+        },
+        "value_col": "Obesity",
+        "value_dtype": "float32",
+        "indexed": True,
+    },
+}
+
+# Read and prepare a single dataset, preferring the local Parquet copy
+def fetch_dataset(name):
+    path = CACHE_DIR / f"{name}-v{CACHE_VERSION}.parquet"
+    if path.exists():
+        return pd.read_parquet(path)
+    spec = DATASETS[name]
+    url = BASE_URL + spec["file"]
+    if spec["indexed"]:
+        df = pd.read_csv(url, engine="pyarrow", usecols=["Year", *spec["rename"]], dtype={"Year": "int16"})
+    else:
+        df = pd.read_csv(url, quotechar='"', skipinitialspace=True)
+    df = df.rename(columns=spec["rename"])
+    df[spec["value_col"]] = pd.to_numeric(df[spec["value_col"]], errors="coerce").astype(spec["value_dtype"])
+    if spec["indexed"]:
+        df = df.set_index(["Year", "Country"]).sort_index()
+    else:
+        df["Country"] = df["Country"].astype("category")
+    # Write to a temporary file and move it into place so readers never see a partial file.
+    # The Parquet copy is only an optimization, so a failed write must not stop the app.
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
     return df
 
-# Load Agricultural Land Data
+# Fetch every dataset concurrently, once per process
+@st.cache_resource
+def preload_datasets():
+    with ThreadPoolExecutor(len(DATASETS)) as executor:
+        return dict(zip(DATASETS, executor.map(fetch_dataset, DATASETS)))
+
+# Load a dataset by name. The frame is shared across reruns, so callers must not modify it in place.
+def load(name):
+    return preload_datasets()[name]
+
+# Meat production over time for the selected countries
 @st.cache_data
-def load_agriculture_data():
-    url = "https://raw.githubusercontent.com/jadegem5/Meat-World-Project/refs/heads/main/total-agricultural-area-over-the-long-term.csv"
-    df = pd.read_csv(url)
-    df.rename(columns={
-        "Entity": "Country",
-        "Land use: Agriculture": "Agricultural_Area"
-    }, inplace=True)
-    return df
+def get_meat_line_data(selected_countries):
+    data = load("meat")
+    # (Year, Country) is unique and already sorted, so no aggregation is needed
+    return data.loc[(slice(None), list(selected_countries)), ["Meat_Production"]].reset_index()
 
-# Load Meat Consumption Data
+# Agricultural area since 1600 for the selected countries
 @st.cache_data
-def load_consumption_data():
-    url = "https://raw.githubusercontent.com/jadegem5/Meat-World-Project/refs/heads/main/export-2024-11-27T21_19_40.901Z.csv"
-    df = pd.read_csv(url)
-    df.columns = df.columns.str.replace('"', '').str.strip()
-    return df
+def get_ag_line_data(selected_countries):
+    data = load("agriculture")
+    return data.loc[(slice(1600, None), list(selected_countries)), ["Agricultural_Area"]].reset_index()
 
-# Load Obesity Data
+# Obesity over time for the ten countries with the highest rates in the most recent year
 @st.cache_data
-def load_obesity_data():
-    url = "https://raw.githubusercontent.com/jadegem5/Meat-World-Project/refs/heads/main/share-of-adults-defined-as-obese.csv"
-    df = pd.read_csv(url)
-    df.rename(columns={'Entity': 'Country'}, inplace=True)
-    df.rename(columns={'Prevalence of obesity among adults, BMI >= 30 (crude estimate) (%) - Sex: both sexes - Age group: 18+  years': 'Obesity'}, inplace=True)
-    return df
+def get_obesity_view():
+    data = load("obesity")
+    recent_year = int(data.index.get_level_values("Year").max())
+    recent_data = data.xs(recent_year, level="Year")
+    recent_data = recent_data[~recent_data.index.isin(CONTINENTS)]
+    top_10_countries = recent_data.nlargest(10, "Obesity").index.to_numpy()
+    return data[data.index.isin(top_10_countries, level="Country")].reset_index(), recent_year
+
+# Top ten meat producing countries
+MEAT_COUNTRIES = (
+    "United States", "Argentina", "Pakistan", "Germany", "India",
+    "Brazil", "China", "Russia", "Mexico", "Spain"
+)
 
-# Function to get country coordinates using Geopy
-@st.cache_resource
-def get_country_coordinates(country_list):
-    geolocator = Nominatim(user_agent="data-visualization-app")
-    coordinates = []
-    for country in country_list:
-        location = geolocator.geocode(country)
-        if location:
-            coordinates.append((country, location.latitude, location.longitude))
-        else:
-            coordinates.append((country, None, None))  # Handle missing coordinates
-    return pd.DataFrame(coordinates, columns=["Country", "Latitude", "Longitude"])
+# Top ten countries by agricultural land use
+AGRICULTURE_COUNTRIES = (
+    "United States", "Argentina", "India", "Australia", "Brazil",
+    "Kazakhstan", "China", "Russia", "Mexico", "Saudi Arabia"
+)
+
+# Regional aggregates to leave out of the obesity ranking
+CONTINENTS = frozenset([
+    'World', 'Asia', 'Africa', 'Europe', 'North America', 'South America', 'Oceania', 'Antarctica',
+    'Asia (excl. China and India)', 'Europe (excl. Russia)', 'South America (excl. Brazil)'
+])
+
+# Approximate country centroids for the map views (geocoded once, offline)
+COUNTRY_COORDS = {
+    "United States": (39.8, -98.6),
+    "Argentina": (-38.4, -63.6),
+    "Pakistan": (30.4, 69.3),
+    "Germany": (51.2, 10.5),
+    "India": (22.4, 78.7),
+    "Brazil": (-10.3, -53.2),
+    "China": (35.0, 105.0),
+    "Russia": (64.7, 97.7),
+    "Mexico": (23.6, -102.6),
+    "Spain": (39.3, -4.8),
+    "Australia": (-24.8, 134.8),
+    "Kazakhstan": (48.0, 66.9),
+    "Saudi Arabia": (23.9, 45.1),
+}
+
+# Index the coordinates by country so they can be attached with Series.map
+@st.cache_data
+def get_coordinate_lookup():
+    coordinates = pd.DataFrame.from_dict(COUNTRY_COORDS, orient="index", columns=["Latitude", "Longitude"])
+    return coordinates["Latitude"], coordinates["Longitude"]
 
 # App title
 st.title("Global Trends in Meat Production, Consumption, Obesity, and Land Use")
 
-# User input to select dataset
-dataset_choice = st.radio(
-    "Choose the dataset to visualize",
-    ("Meat Production", "Agricultural Land Use", "Meat Consumption", "Obesity")
+# One tab per dataset. Switching tabs reruns the script and only the open tab's body runs.
+tab_meat, tab_agriculture, tab_consumption, tab_obesity = st.tabs(
+    ["Meat Production", "Agricultural Land Use", "Meat Consumption", "Obesity"],
+    key="dataset",
+    on_change="rerun"
 )
 
-# Visualizations based on dataset choice
-if dataset_choice == "Meat Production" or dataset_choice == "Agricultural Land Use":
-    # Load the selected dataset
-    if dataset_choice == "Meat Production":
-        data = load_meat_data()
-        st.header("Meat Production Data Visualization")
-        st.markdown("""
-        ### Global Meat Production
-        This visualization displays trends in meat production across the top ten meat producing countries. Select 'Map' to see a geographical representation, where the larger the dot, the higher the meat production is in that country. Try hovering over the dots to see a specific number in tonnes. Alternatively, select 'Line Graph' to view how meat production has evolved over time for a selected set of countries.
-        """)
-        selected_countries = [
-            "United States", "Argentina", "Pakistan", "Germany", "India",
-            "Brazil", "China", "Russia", "Mexico", "Spain"
-        ]
-    elif dataset_choice == "Agricultural Land Use":
-        data = load_agriculture_data()
-        st.header("Agricultural Land Use Over Time")
-        st.markdown("""
-        ### Agricultural Land Use Over Time
-        This visualization shows the changes in agricultural land use in the ten countries with the largest agricultural land use. Most of these countries overlap with the top ten countries for meat production. You can view the data by selecting 'Map' to see the spatial distribution of agricultural land, or 'Line Graph' to see how the area used for agriculture has evolved in different countries.
-        """)
-        selected_countries = [
-            "United States", "Argentina","India","Australia", "Brazil",
-            "Kazakhstan","China","Russia", "Mexico","Saudi Arabia"
-        ]
-
-    # Year selection
-    year = st.slider(
-        label="Select a Year",
-        min_value=int(data["Year"].min()),
-        max_value=int(data["Year"].max()),
-        value=int(data["Year"].min()) if dataset_choice != "Agricultural Land Use" else 1600,
-        step=1
-    )
-    # Filter data for the selected year
-    filtered_data = data[data["Year"] == year]
-    filtered_data = filtered_data[filtered_data["Country"].isin(selected_countries)]
-
-    # Get coordinates for the selected countries
-    coordinates = get_country_coordinates(selected_countries)
-    filtered_data = pd.merge(filtered_data, coordinates, on="Country", how="left")
-
-    # Ensure numeric values for plotting
-    if dataset_choice == "Meat Production":
-        filtered_data["Meat_Production"] = pd.to_numeric(filtered_data["Meat_Production"], errors="coerce")
-    elif dataset_choice == "Agricultural Land Use":
-        filtered_data["Agricultural_Area"] = pd.to_numeric(filtered_data["Agricultural_Area"], errors="coerce")
-
-    # Drop rows with missing coordinates
-    filtered_data = filtered_data.dropna(subset=["Latitude", "Longitude"])
-
-    # User input option for map or line graph
-    visualization_choice = st.radio(
-        "Choose Visualization Type",
-        ("Map", "Line Graph")
-    )
-
-    if visualization_choice == "Map":
+# Map and line graph views shared by the production and land use tabs
+for tab, dataset_choice in ((tab_meat, "Meat Production"), (tab_agriculture, "Agricultural Land Use")):
+    if not tab.open:
+        continue
+    with tab:
+        # Load the selected dataset
         if dataset_choice == "Meat Production":
-            layer = pdk.Layer(
-                "ScatterplotLayer",
-                data=filtered_data,
-                get_position="[Longitude, Latitude]",
-                get_radius="Meat_Production / 10",
-                get_fill_color="[255, 100, Meat_Production / 10000]",
-                get_line_color="[0, 0, 0, 50]",
-                opacity=0.5,
-                pickable=True,
-            )
-            tooltip = {"text": "{Country}: {Meat_Production} tonnes"}
+            data = load("meat")
+            st.header("Meat Production Data Visualization")
+            st.markdown("""
+            ### Global Meat Production
+            This visualization displays trends in meat production across the top ten meat producing countries. Select 'Map' to see a geographical representation, where the larger the dot, the higher the meat production is in that country. Try hovering over the dots to see a specific number in tonnes. Alternatively, select 'Line Graph' to view how meat production has evolved over time for a selected set of countries.
+            """)
+            selected_countries = MEAT_COUNTRIES
         elif dataset_choice == "Agricultural Land Use":
-            layer = pdk.Layer(
-                "ScatterplotLayer",
-                data=filtered_data,
-                get_position="[Longitude, Latitude]",
-                get_radius="Agricultural_Area / 1000",
-                get_fill_color="[100, 200, Agricultural_Area / 5000, 150]",
-                opacity=0.5,
-                pickable=True,
-            )
-            tooltip = {"text": "{Country}: {Agricultural_Area} sq. km"}
-
-        view_state = pdk.ViewState(
-            latitude=20,
-            longitude=0,
-            zoom=1.5,
-            pitch=0
+            data = load("agriculture")
+            st.header("Agricultural Land Use Over Time")
+            st.markdown("""
+            ### Agricultural Land Use Over Time
+            This visualization shows the changes in agricultural land use in the ten countries with the largest agricultural land use. Most of these countries overlap with the top ten countries for meat production. You can view the data by selecting 'Map' to see the spatial distribution of agricultural land, or 'Line Graph' to see how the area used for agriculture has evolved in different countries.
+            """)
+            selected_countries = AGRICULTURE_COUNTRIES
+
+        # Year selection
+        years = data.index.get_level_values("Year")
+        year = st.slider(
+            label="Select a Year",
+            min_value=int(years.min()),
+            max_value=int(years.max()),
+            value=int(years.min()) if dataset_choice != "Agricultural Land Use" else 1600,
+            step=1,
+            key=f"year_{dataset_choice}"
+        )
+        # Filter data for the selected year and countries
+        # (a mask rather than .loc, so a year with no rows yields an empty frame)
+        filtered_data = data[
+            data.index.isin([year], level="Year") & data.index.isin(selected_countries, level="Country")
+        ].reset_index()
+
+        # Attach coordinates for the selected countries
+        coord_lat, coord_lon = get_coordinate_lookup()
+        filtered_data = filtered_data.assign(
+            Latitude=filtered_data["Country"].map(coord_lat),
+            Longitude=filtered_data["Country"].map(coord_lon)
         )
 
-        st.pydeck_chart(pdk.Deck(
-            layers=[layer],
-            initial_view_state=view_state,
-            tooltip=tooltip
-        ))
+        # User input option for map or line graph
+        visualization_choice = st.radio(
+            "Choose Visualization Type",
+            ("Map", "Line Graph"),
+            key=f"view_{dataset_choice}"
+        )
 
-    elif visualization_choice == "Line Graph":
-        if dataset_choice == "Meat Production":
-            line_graph_data = data[data["Country"].isin(selected_countries)]
-            line_graph_data["Meat_Production"] = pd.to_numeric(line_graph_data["Meat_Production"], errors="coerce")
-            line_graph_data = line_graph_data.groupby(["Year", "Country"])["Meat_Production"].sum().reset_index()
+        if visualization_choice == "Map":
+            # Precompute marker colors as plain columns, shading the blue channel by value
+            if dataset_choice == "Meat Production":
+                blue = (filtered_data["Meat_Production"] / 10000).clip(0, 255).fillna(0).astype(int)
+                filtered_data = filtered_data.assign(fill="rgb(255, 100, " + blue.astype(str) + ")")
+                fig = px.scatter_geo(filtered_data,
+                                     lat="Latitude",
+                                     lon="Longitude",
+                                     size="Meat_Production",
+                                     hover_name="Country",
+                                     hover_data={"Latitude": False, "Longitude": False},
+                                     labels={"Meat_Production": "Meat Production (Tonnes)"},
+                                     projection="natural earth",
+                                     opacity=0.5)
+            elif dataset_choice == "Agricultural Land Use":
+                blue = (filtered_data["Agricultural_Area"] / 5000).clip(0, 255).fillna(0).astype(int)
+                filtered_data = filtered_data.assign(fill="rgb(100, 200, " + blue.astype(str) + ")")
+                fig = px.scatter_geo(filtered_data,
+                                     lat="Latitude",
+                                     lon="Longitude",
+                                     size="Agricultural_Area",
+                                     hover_name="Country",
+                                     hover_data={"Latitude": False, "Longitude": False},
+                                     labels={"Agricultural_Area": "Agricultural Area (sq. km)"},
+                                     projection="natural earth",
+                                     opacity=0.5)
+
+            fig.update_traces(marker_color=filtered_data["fill"])
+            st.plotly_chart(fig)
+
+        elif visualization_choice == "Line Graph":
+            if dataset_choice == "Meat Production":
+                line_graph_data = get_meat_line_data(selected_countries)
+
+                fig = px.line(line_graph_data,
+                              x="Year",
+                              y="Meat_Production",
+                              color="Country",
+                              title="Meat Production Over Time for Selected Countries",
+                              labels={"Meat_Production": "Meat Production (Tonnes)", "Country": "Countries"})
+
+                st.plotly_chart(fig)
+
+            elif dataset_choice == "Agricultural Land Use":
+                line_graph_data = get_ag_line_data(selected_countries)
+
+                fig = px.line(line_graph_data,
+                              x="Year",
+                              y="Agricultural_Area",
+                              color="Country",
+                              title="Agricultural Area Over Time for Selected Countries",
+                              range_x=[1600, int(years.max())],
+                              labels={"Agricultural_Area": "Agricultural Area (sq. km)", "Country": "Countries"})
+
+                st.plotly_chart(fig)
+
+if tab_consumption.open:
+    with tab_consumption:
+        data = load("consumption")
+        st.header("Meat Consumption Data Visualization")
+        st.markdown("""
+        ### Top Countries for Beef Consumption
+        This bar chart shows the top 10 countries with the highest beef consumption per capita in 2023. The countries are sorted in descending order based on the amount of beef consumed per person, measured in kilograms. This gives a comparative view of global beef consumption patterns.
+        """)
+        # nlargest already returns the rows in descending order
+        top_10 = data.nlargest(10, 'Kilograms/capita')
+        top_10 = top_10.assign(Country=top_10['Country'].cat.set_categories(top_10['Country'].tolist(), ordered=True))
+
+        fig = px.bar(top_10, x='Country', y='Kilograms/capita',
+                     title='Top 10 Countries for Beef Consumption in 2023',
+                     labels={'Kilograms/capita': 'Beef Consumption (kg/capita)'})
+        st.plotly_chart(fig)
+
+if tab_obesity.open:
+    with tab_obesity:
+        st.header("Obesity Data Visualization")
+        st.markdown("""
+        ### Obesity Trends by Country
+        This line graph tracks the prevalence of obesity among adults in the top 10 countries with the highest obesity rates. The data shows the percentage of adults with a BMI of 30 or more, from the earliest year available to the most recent. This provides an insight into how obesity rates have changed over time in these countries. Try hovering over the lines to get a specific number for a year.
+        """)
 
-            fig, ax = plt.subplots(figsize=(10, 6))
-            for country in selected_countries:
-                country_data = line_graph_data[line_graph_data["Country"] == country]
-                ax.plot(country_data["Year"], country_data["Meat_Production"], label=country)
+        filtered_df, recent_year = get_obesity_view()
 
-            ax.set_xlabel("Year")
-            ax.set_ylabel("Meat Production (Tonnes)")
-            ax.set_title("Meat Production Over Time for Selected Countries")
-            ax.legend(title="Countries")
-            st.pyplot(fig)
+        fig = px.line(filtered_df,
+                      x='Year',
+                      y='Obesity',
+                      color='Country',
+                      title='Top 10 Countries by Obesity Rate',
+                      range_x=[1980, recent_year],
+                      color_discrete_sequence=px.colors.qualitative.Set3)
 
-        elif dataset_choice == "Agricultural Land Use":
-            line_graph_data = data[(data["Year"] >= 1600) & (data["Country"].isin(selected_countries))]
-            line_graph_data["Agricultural_Area"] = pd.to_numeric(line_graph_data["Agricultural_Area"], errors="coerce")
-            line_graph_data = line_graph_data.groupby(["Year", "Country"])["Agricultural_Area"].sum().reset_index()
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            for country in selected_countries:
-                country_data = line_graph_data[line_graph_data["Country"] == country]
-                ax.plot(country_data["Year"], country_data["Agricultural_Area"], label=country)
-
-            ax.set_xlim(1600, int(data["Year"].max()))
-            ax.set_xlabel("Year")
-            ax.set_ylabel("Agricultural Area (sq. km)")
-            ax.set_title("Agricultural Area Over Time for Selected Countries")
-            ax.legend(title="Countries")
-            st.pyplot(fig)
-
-elif dataset_choice == "Meat Consumption":
-    data = load_consumption_data()
-    st.header("Meat Consumption Data Visualization")
-    st.markdown("""
-    ### Top Countries for Beef Consumption
-    This histogram shows the top 10 countries with the highest beef consumption per capita in 2023. The countries are sorted in descending order based on the amount of beef consumed per person, measured in kilograms. This gives a comparative view of global beef consumption patterns.
-    """)
-    top_5 = data.nlargest(10, 'Kilograms/capita')
-
-    fig = px.histogram(top_5, x='Country', y='Kilograms/capita',
-                       title='Top 10 Countries for Beef Consumption in 2023',
-                       labels={'Kilograms/capita': 'Beef Consumption (kg/capita)'})
-    st.plotly_chart(fig)
-
-elif dataset_choice == "Obesity":
-    data = load_obesity_data()
-    st.header("Obesity Data Visualization")
-    st.markdown("""
-    ### Obesity Trends by Country
-    This line graph tracks the prevalence of obesity among adults in the top 10 countries with the highest obesity rates. The data shows the percentage of adults with a BMI of 30 or more, from the earliest year available to the most recent. This provides an insight into how obesity rates have changed over time in these countries. Try hovering over the lines to get a specific number for a year.
-    """)
-
-    top_10_countries = data.sort_values(by='Obesity', ascending=False).head(10)
-
-    recent_year = data['Year'].max()
-    recent_data = data[data['Year'] == recent_year]
-
-    continents = ['World', 'Asia', 'Africa', 'Europe', 'North America', 'South America', 'Oceania', 'Antarctica', 'Asia (excl. China and India)', 'Europe (excl. Russia)', 'South America (excl. Brazil)']
-
-    recent_data = recent_data[~recent_data['Country'].isin(continents)]
-
-    top_10_countries = recent_data.sort_values(by = ['Obesity'], ascending = False)['Country'].head(10).tolist()
-    filtered_df = data[data['Country'].isin(top_10_countries)]
-
-    fig = px.line(filtered_df,
-                  x='Year',
-                  y='Obesity',
-                  color='Country',
-                  title='Top 10 Countries by Obesity Rate',
-                  range_x=[1980, recent_year],
-                  color_discrete_sequence=px.colors.qualitative.Set3)
-
-    st.plotly_chart(fig)
+        st.plotly_chart(fig)